@@ -14,24 +14,157 @@ Example:
 
 import sys
 import re
-import argparse
+import logging
 from urllib.parse import urljoin, urlparse
 import os
+import zipfile
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
-from ebooklib import epub
+import lxml.etree
+import lxml.html
 from io import BytesIO
-from PIL import Image
+
+
+log = logging.getLogger('ebangla')
+
+MAX_WORKERS = 8
+USER_AGENT = 'Mozilla/5.0 (compatible; ebangla-to-epub)'
+# (connect, read): give up quickly on an unreachable host, but let slow pages finish.
+REQUEST_TIMEOUT = (5, 30)
+EPUB_COMPRESSLEVEL = 3
+PAGE_CHUNK_SIZE = 64 * 1024
+COVER_CHUNK_SIZE = 64 * 1024
+COVER_MAX_BYTES = 10 * 1024 * 1024
+JPEG_PASSTHROUGH_MAX_BYTES = 1_500_000
+CACHE_NAME = 'ebangla_to_epub'
+CACHE_EXPIRE_AFTER = timedelta(days=7)
+
+_BAD_FN_CHARS = str.maketrans('', '', '<>:"/\\|?*')
+_GENERIC_MIME_TYPES = frozenset({'application/octet-stream', 'binary/octet-stream'})
+_XML_ESCAPES = str.maketrans({
+    '&': '&amp;',
+    '<': '&lt;',
+    '>': '&gt;',
+    '"': '&quot;',
+    "'": '&apos;',
+})
+_XHTML_PREFIX = '<html><head><title>'
+_XHTML_BODY = '</title></head><body>'
+_XHTML_SUFFIX = '</body></html>'
+_RE_TOPICS_SUFFIX = re.compile(r'\d+\s*Topics?$')
+# Matches "অধ্যায়" written with either য + nukta or the precomposed য়.
+_RE_IS_CHAPTER = re.compile('অধ্যা(?:\u09af\u09bc|\u09df)|^Chapter')
+_RE_META_KEYWORDS = re.compile('সম্পাদনা|সঙ্কলন|কৃতজ্ঞতা')
+_META_KEYWORD_FIELDS = {
+    'সম্পাদনা': 'editors',
+    'সঙ্কলন': 'editors',
+    'কৃতজ্ঞতা': 'acknowledgments',
+}
+_SKIP_TITLES = frozenset({'', 'Book Information', 'সারাংশ', 'Reader Interactions'})
+_XPATH_TOC = lxml.etree.XPath("//div[@id='ftwp-container-outer']")
+_XPATH_POSTCONTENT = lxml.etree.XPath("//div[@id='ftwp-postcontent']")
+_XPATH_CONTENT_CANDIDATES = lxml.etree.XPath(
+    "//div[contains(@class, 'entry-content') or contains(@class, 'ld-tab-content')]")
+_XPATH_HAS_CONTENT = lxml.etree.XPath("normalize-space() != '' or boolean(.//img)")
+_XPATH_PAGE_TITLE = lxml.etree.XPath("//title")
+_XPATH_PAGE_H1 = lxml.etree.XPath("//h1")
+_XPATH_INTRO_TAB = lxml.etree.XPath("//div[starts-with(@id, 'ld-tab-content-')]")
+_XPATH_COVER_IMG = lxml.etree.XPath(
+    "//img[contains(concat(' ', normalize-space(@class), ' '), ' entry-image ')]")
+_XPATH_ARTICLE = lxml.etree.XPath("//article")
+_XPATH_POST_CONTAINER = lxml.etree.XPath("//div[starts-with(@id, 'learndash_post_')]")
+_XPATH_LESSON_ITEMS = lxml.etree.XPath(
+    ".//div[contains(concat(' ', normalize-space(@class), ' '), ' ld-item-lesson-item ')]")
+_XPATH_ITEM_NAME_LINKS = lxml.etree.XPath(
+    ".//a[contains(concat(' ', normalize-space(@class), ' '), ' ld-item-name ')]")
+_XPATH_ITEM_TITLE = lxml.etree.XPath(
+    ".//div[contains(concat(' ', normalize-space(@class), ' '), ' ld-item-title ')]")
+_XPATH_HREF_LINKS = lxml.etree.XPath(".//a[@href]")
+# Visible text only, like BeautifulSoup's get_text(): no script, style or template bodies.
+_XPATH_TEXT = lxml.etree.XPath(
+    ".//text()[not(ancestor::script or ancestor::style or ancestor::template)]",
+    smart_strings=False)
+_UNWANTED_TAGS = frozenset({'script', 'style', 'ins', 'button'})
+_AD_CLASS_MARKERS = ('google-anno', 'google-auto-placed', 'adsbygoogle', 'simplefavorite-button')
+_LMS_CLASSES = frozenset({
+    'ld-course-status',
+    'ld-course-progress',
+    'ld-tabs-navigation',
+    'ld-expand-button',
+    'ld-status-icon',
+})
+_ARIA_ATTRS = ('aria-labelledby', 'aria-describedby', 'aria-controls', 'aria-owns')
+
+
+def create_session(use_cache=True, max_workers=MAX_WORKERS):
+    """Create a requests session shared by all fetches so connections are reused.
+    When requests-cache is installed, responses are cached in the user cache
+    directory so re-running on the same book, from any folder, skips the network.
+    """
+    try:
+        from requests_cache import CachedSession
+    except ImportError:
+        CachedSession = None
+    if use_cache and CachedSession is not None:
+        session = CachedSession(
+            CACHE_NAME,
+            backend='sqlite',
+            use_cache_dir=True,
+            expire_after=CACHE_EXPIRE_AFTER,
+            allowable_methods=('GET',),
+            cache_control=True,
+        )
+    else:
+        session = requests.Session()
+    # Back off and retry throttling (429) and transient server errors instead of
+    # dropping the chapter; Retry-After is honoured. 404s still fail at once.
+    retry = Retry(total=5, backoff_factor=1.0, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset({'GET'}), respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers,
+                          max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'User-Agent': USER_AGENT})
+    return session
 
 
 def sanitize_filename(filename):
     """Remove or replace characters that are invalid in filenames."""
-    filename = re.sub(r'[<>:"/\\|?*]', '', filename)
-    return filename[:200]
+    return filename.translate(_BAD_FN_CHARS)[:200]
+
+
+def scan_book_page(tree, url):
+    """Find the book page's landmarks and extract its metadata and chapters.
+    The landmarks the extractors need (title, intro tab, cover image,
+    article and LearnDash course container) are located with compiled
+    XPath on the lxml tree. Returns tuple of (metadata, chapters).
+    """
+    page = {
+        'title': _first_match(tree, _XPATH_PAGE_TITLE),
+        'h1': _first_match(tree, _XPATH_PAGE_H1),
+        'tab_content': _first_match(tree, _XPATH_INTRO_TAB),
+        'cover_img': _first_match(tree, _XPATH_COVER_IMG),
+        'article': _first_match(tree, _XPATH_ARTICLE),
+        'post_container': _first_match(tree, _XPATH_POST_CONTAINER),
+    }
+    metadata = extract_book_metadata(page, url)
+    chapters = extract_direct_content_chapters(page['article'])
+    if not chapters:
+        chapters = extract_chapter_links(page['post_container'], url)
+    return metadata, chapters
+
 
+def _get_text(element):
+    """lxml equivalent of BeautifulSoup's get_text(strip=True)."""
+    return ''.join(text.strip() for text in _XPATH_TEXT(element))
 
-def extract_book_metadata(soup, url):
-    """Extract book metadata from the main book page."""
+
+def extract_book_metadata(page, url):
+    """Extract book metadata from the landmarks found by scan_book_page."""
     metadata = {
         'title': '',
         'subtitle': '',
@@ -42,125 +175,124 @@ def extract_book_metadata(soup, url):
         'url': url,
         'filename_title': ''
     }
-    if soup.title and soup.title.string:
-        metadata['filename_title'] = soup.title.string.strip()
-    tab_content = soup.find('div', id=re.compile(r'ld-tab-content-\d+'))
-    if tab_content:
-        tab_content_copy = BeautifulSoup(str(tab_content), 'lxml')
-        for button in tab_content_copy.find_all('button', class_='simplefavorite-button'):
-            button.decompose()
-        for unwanted in tab_content_copy.find_all(['script', 'style']):
-            unwanted.decompose()
-        intro_html_raw = str(tab_content_copy.find('div', id=re.compile(r'ld-tab-content-\d+')))
-        metadata['intro_html'] = clean_html_for_epub(intro_html_raw)
-        text_content = tab_content.get_text(separator='\n', strip=True)
-        lines = [line.strip() for line in text_content.split('\n') if line.strip()]
+    title_tag = page['title']
+    if title_tag is not None and title_tag.text:
+        metadata['filename_title'] = title_tag.text.strip()
+    tab_content = page['tab_content']
+    if tab_content is not None:
+        lines = [line.strip() for text in _XPATH_TEXT(tab_content)
+                 for line in text.split('\n') if line.strip()]
+        metadata['intro_html'] = clean_html_for_epub(tab_content)
         if lines:
             metadata['title'] = lines[0]
         for i, line in enumerate(lines):
             if i == 1 and line:
                 metadata['subtitle'] = line
-            if 'সম্পাদনা' in line or 'সঙ্কলন' in line:
-                metadata['editors'] = line
-            if 'কৃতজ্ঞতা' in line:
-                metadata['acknowledgments'] = line
+            for keyword in _RE_META_KEYWORDS.findall(line):
+                metadata[_META_KEYWORD_FIELDS[keyword]] = line
     if not metadata['title']:
-        h1 = soup.find('h1')
-        if h1:
-            metadata['title'] = h1.get_text(strip=True)
+        h1 = page['h1']
+        if h1 is not None:
+            metadata['title'] = _get_text(h1)
         else:
-            metadata['title'] = soup.title.string if soup.title else 'Unknown Book'
-    cover_img = soup.find('img', class_='entry-image')
-    if cover_img:
+            metadata['title'] = title_tag.text if title_tag is not None else 'Unknown Book'
+    cover_img = page['cover_img']
+    if cover_img is not None:
         metadata['cover_image_url'] = cover_img.get('data-src') or cover_img.get('src') or ''
     return metadata
 
 
-def clean_html_for_epub(html):
-    """Clean HTML to make it XHTML-compliant for EPUB."""
-    html = re.sub(r'<br\s*>', '<br/>', html)
-    html = re.sub(r'<hr\s*>', '<hr/>', html)
-    html = re.sub(r'<img([^>]*[^/])>', r'<img\1/>', html)
-    soup = BeautifulSoup(html, 'lxml')
-    for tag in soup.find_all(['script', 'style', 'ins', 'button']):
-        tag.decompose()
-    for nav_tag in soup.find_all('nav'):
-        if nav_tag.get('id') == 'ftwp-contents':
-            continue
-        nav_tag.decompose()
-    google_selectors = [
-        {'class_': re.compile(r'google-anno.*')},
-        {'class_': re.compile(r'google-auto-placed')},
-        {'class_': re.compile(r'adsbygoogle')},
-    ]
-    for selector in google_selectors:
-        for tag in soup.find_all(**selector):
-            tag.decompose()
-    for tag in soup.find_all(class_=re.compile(r'simplefavorite-button')):
-        tag.decompose()
-    lms_classes = [
-        'ld-course-status',
-        'ld-course-progress',
-        'ld-tabs-navigation',
-        'ld-expand-button',
-        'ld-status-icon',
-    ]
-    for cls in lms_classes:
-        for tag in soup.find_all(class_=cls):
-            tag.decompose()
-    for tag in soup.find_all(attrs={'aria-labelledby': True}):
-        del tag['aria-labelledby']
-    for tag in soup.find_all(attrs={'aria-describedby': True}):
-        del tag['aria-describedby']
-    for tag in soup.find_all(attrs={'aria-controls': True}):
-        del tag['aria-controls']
-    for tag in soup.find_all(attrs={'aria-owns': True}):
-        del tag['aria-owns']
-    return str(soup)
-
-
-def download_image(url):
+def clean_html_for_epub(element):
+    """Clean an lxml element in place and serialize it as XHTML for EPUB.
+    Only the element itself is returned, without its tail text.
+    """
+    _strip_unwanted_nodes(element)
+    return lxml.etree.tostring(element, method='xml', encoding='unicode', with_tail=False)
+
+
+def _is_unwanted(name, element_id, classes):
+    """Tell whether a tag is a script, ad or LMS widget that has no place in the EPUB."""
+    if name in _UNWANTED_TAGS or (name == 'nav' and element_id != 'ftwp-contents'):
+        return True
+    return any(cls in _LMS_CLASSES or any(marker in cls for marker in _AD_CLASS_MARKERS)
+               for cls in classes)
+
+
+def _strip_unwanted_nodes(root):
+    """Remove scripts, ads, LMS widgets and aria references below root in place.
+    drop_tree() keeps the text that follows a removed node.
+    Only tags that can match by name, or carry a class, go through _is_unwanted.
+    """
+    doomed = []
+    for element in root.iter(lxml.etree.Element):
+        attrib = element.attrib
+        if element is not root and (element.tag in _UNWANTED_TAGS or element.tag == 'nav'
+                                    or 'class' in attrib):
+            if _is_unwanted(element.tag, attrib.get('id'), attrib.get('class', '').split()):
+                doomed.append(element)
+                continue
+        if attrib:
+            for attr in _ARIA_ATTRS:
+                attrib.pop(attr, None)
+    for element in doomed:
+        element.drop_tree()
+
+
+def is_image_response(response):
+    """Check the Content-Type header before handing the body to Pillow.
+    Servers that omit the header or send a generic binary type are given
+    the benefit of the doubt; anything else (e.g. an HTML error page) is
+    rejected without decoding.
+    """
+    content_type = response.headers.get('Content-Type', '')
+    mime_type = content_type.split(';', 1)[0].strip().lower()
+    return not mime_type or mime_type in _GENERIC_MIME_TYPES or mime_type.startswith('image/')
+
+
+def _to_rgb_jpeg(buffer, quality):
+    """Decode an image, flatten any transparency onto white and encode it as JPEG.
+    The image is always fully decoded, so corrupt or truncated data raises.
+    An RGB JPEG under JPEG_PASSTHROUGH_MAX_BYTES is then returned as is, since
+    re-encoding it would only cost time and quality.
+    """
+    from PIL import Image
+    img = Image.open(buffer)
+    img.load()
+    if (img.format == 'JPEG' and img.mode == 'RGB'
+            and buffer.getbuffer().nbytes <= JPEG_PASSTHROUGH_MAX_BYTES):
+        return buffer.getvalue()
+    if img.mode == 'P':
+        img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+    if img.mode in ('RGBA', 'LA'):
+        background = Image.new('RGBA', img.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(background, img.convert('RGBA')).convert('RGB')
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+    with BytesIO() as output:
+        img.save(output, format='JPEG', quality=quality)
+        return output.getvalue()
+
+
+def download_image(url, session):
     """Download an image and convert it to JPEG format.
     Returns tuple of (image_data, extension) or (None, None) on failure.
     """
     if not url:
         return None, None
     try:
-        response = requests.get(url, timeout=30)
+        response = session.get(url, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
+        if not is_image_response(response):
+            return None, None
         if not response.content or len(response.content) < 100:
             return None, None
-        img = Image.open(BytesIO(response.content))
-        img.verify()
-        img = Image.open(BytesIO(response.content))
-        if img.mode in ('RGBA', 'LA'):
-            rgb_img = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'RGBA':
-                rgb_img.paste(img, mask=img.split()[-1])
-            else:
-                rgb_img.paste(img.convert('RGB'))
-            img = rgb_img
-        elif img.mode == 'P':
-            if 'transparency' in img.info:
-                img = img.convert('RGBA')
-                rgb_img = Image.new('RGB', img.size, (255, 255, 255))
-                rgb_img.paste(img, mask=img.split()[-1])
-                img = rgb_img
-            else:
-                img = img.convert('RGB')
-        elif img.mode != 'RGB':
-            img = img.convert('RGB')
-        output = BytesIO()
-        img.save(output, format='JPEG', quality=90)
-        jpeg_data = output.getvalue()
-        output.close()
-        return jpeg_data, 'jpg'
+        return _to_rgb_jpeg(BytesIO(response.content), quality=90), 'jpg'
     except Exception as e:
-        print(f"  Warning: Could not download image {url}: {e}")
+        log.warning(f"  Warning: Could not download image {url}: {e}")
         return None, None
 
 
-def process_intro_images(html):
+def process_intro_images(html, session, executor):
     """Extract and download all images from intro HTML.
     Returns:
         - Modified HTML with updated image references
@@ -169,6 +301,7 @@ def process_intro_images(html):
     soup = BeautifulSoup(html, 'html.parser')
     images_to_embed = []
     img_counter = 0
+    pending = []
     for img_tag in soup.find_all('img'):
         data_src = img_tag.get('data-src')
         data_lazy_src = img_tag.get('data-lazy-src')
@@ -183,8 +316,10 @@ def process_intro_images(html):
         if not img_url:
             img_tag.decompose()
             continue
-        print(f"  Downloading intro image: {img_url[:80]}...")
-        img_data, ext = download_image(img_url)
+        log.info(f"  Downloading intro image: {img_url[:80]}...")
+        pending.append((img_tag, img_url))
+    results = executor.map(lambda item: download_image(item[1], session), pending)
+    for (img_tag, _), (img_data, ext) in zip(pending, results):
         if img_data:
             img_counter += 1
             img_filename = f'intro_image_{img_counter}.{ext}'
@@ -194,7 +329,7 @@ def process_intro_images(html):
                         'data-sizes', 'sizes', 'data-lazy-srcset', 'loading']:
                 if img_tag.has_attr(attr):
                     del img_tag[attr]
-            print(f"  ✓ Image embedded as {img_filename}")
+            log.info(f"  ✓ Image embedded as {img_filename}")
         else:
             img_tag.decompose()
     for source_tag in soup.find_all('source'):
@@ -204,36 +339,45 @@ def process_intro_images(html):
     return str(soup), images_to_embed
 
 
-def extract_direct_content_chapters(soup):
-    """Extract chapters directly from the page (new structure)."""
+def extract_direct_content_chapters(article):
+    """Extract chapters directly from the page's article (new structure)."""
     chapters = []
-    article = soup.find('article')
-    if not article:
+    if article is None:
         return chapters
-    headings = article.find_all('h2')
+    headings = list(article.iter('h2'))
     has_chapter_headings = False
     for heading in headings:
-        text = heading.get_text(strip=True)
-        if 'অধ্যায়' in text or text.startswith('Chapter') or text.startswith('অধ্যায়'):
+        text = _get_text(heading)
+        if _RE_IS_CHAPTER.search(text):
             has_chapter_headings = True
             break
     if not has_chapter_headings:
         return chapters
+    # Keyed by the elements themselves: the dict and the headings list keep the
+    # lxml proxies alive, so no two nodes can share an id() while grouping.
+    paragraphs_by_heading = {}
+    parents = list(dict.fromkeys(heading.getparent() for heading in headings))
+    for parent in parents:
+        current_parts = None
+        for child in parent:
+            if child.tag == 'h2':
+                current_parts = paragraphs_by_heading.setdefault(child, [])
+            elif child.tag == 'p' and current_parts is not None:
+                current_parts.append(child)
     for heading in headings:
-        chapter_title = heading.get_text(strip=True)
-        if not chapter_title or chapter_title in ['Book Information', 'সারাংশ', 'Reader Interactions']:
+        chapter_title = _get_text(heading)
+        if chapter_title in _SKIP_TITLES:
             continue
-        content_parts = []
-        current = heading.find_next_sibling()
-        while current:
-            if current.name == 'h2':
-                break
-            if current.name == 'p':
-                content_parts.append(str(current))
-            current = current.find_next_sibling()
+        content_parts = paragraphs_by_heading.get(heading, [])
         if content_parts:
-            raw_content = '\n'.join(content_parts)
-            cleaned_content = clean_html_for_epub(raw_content)
+            container = lxml.html.Element('div')
+            for paragraph in content_parts:
+                container.append(paragraph)
+                paragraph.tail = None
+            _strip_unwanted_nodes(container)
+            cleaned_content = ''.join(
+                lxml.etree.tostring(paragraph, method='xml', encoding='unicode')
+                for paragraph in container)
             chapters.append({
                 'title': chapter_title,
                 'content': cleaned_content,
@@ -242,67 +386,75 @@ def extract_direct_content_chapters(soup):
     return chapters
 
 
-def extract_chapter_links(soup, base_url):
+def extract_chapter_links(post_container, base_url):
     chapters = []
-    post_container = soup.find('div', id=re.compile(r'learndash_post_\d+'))
-    if post_container:
-        lesson_items = post_container.find_all('div', class_='ld-item-lesson-item')
+    seen_urls = set()
+    if post_container is not None:
+        lesson_items = _XPATH_LESSON_ITEMS(post_container)
         for lesson_item in lesson_items:
-            is_expandable = 'ld-expandable' in lesson_item.get('class', [])
-            lesson_link = lesson_item.find('a', class_='ld-item-name')
-            if not is_expandable and lesson_link:
+            is_expandable = 'ld-expandable' in lesson_item.get('class', '').split()
+            lesson_link = _first_match(lesson_item, _XPATH_ITEM_NAME_LINKS)
+            if not is_expandable and lesson_link is not None:
                 lesson_url = lesson_link.get('href')
-                lesson_title = lesson_link.get_text(strip=True)
+                lesson_title = _get_text(lesson_link)
                 if lesson_url and lesson_title and '/lessons/' in lesson_url:
                     lesson_url = urljoin(base_url, lesson_url)
-                    if not any(ch['url'] == lesson_url for ch in chapters):
+                    if lesson_url not in seen_urls:
+                        seen_urls.add(lesson_url)
                         chapters.append({
                             'title': lesson_title,
                             'url': lesson_url,
                             'type': 'link'
                         })
-            elif is_expandable and lesson_link:
+            elif is_expandable and lesson_link is not None:
                 lesson_url = lesson_link.get('href')
-                title_div = lesson_link.find('div', class_='ld-item-title')
-                lesson_title = title_div.get_text(strip=True) if title_div else lesson_link.get_text(strip=True)
-                lesson_title = re.sub(r'\d+\s*Topics?$', '', lesson_title).strip()
+                title_div = _first_match(lesson_link, _XPATH_ITEM_TITLE)
+                lesson_title = _get_text(title_div if title_div is not None else lesson_link)
+                lesson_title = _RE_TOPICS_SUFFIX.sub('', lesson_title).strip()
                 if lesson_url and lesson_title and '/lessons/' in lesson_url:
                     lesson_url = urljoin(base_url, lesson_url)
-                    if not any(ch['url'] == lesson_url for ch in chapters):
+                    if lesson_url not in seen_urls:
+                        seen_urls.add(lesson_url)
                         chapters.append({
                             'title': lesson_title,
                             'url': lesson_url,
                             'type': 'link'
                         })
-                topic_links = lesson_item.find_all('a', href=True)
+                topic_links = _XPATH_HREF_LINKS(lesson_item)
                 for link in topic_links:
                     chapter_url = link.get('href')
-                    chapter_title = link.get_text(strip=True)
-                    if chapter_url and chapter_title and '/topics/' in chapter_url:
+                    if '/topics/' not in chapter_url:
+                        continue
+                    chapter_title = _get_text(link)
+                    if chapter_title:
                         chapter_url = urljoin(base_url, chapter_url)
-                        if not any(ch['url'] == chapter_url for ch in chapters):
+                        if chapter_url not in seen_urls:
+                            seen_urls.add(chapter_url)
                             chapters.append({
                                 'title': chapter_title,
                                 'url': chapter_url,
                                 'type': 'link'
                             })
         if not chapters:
-            all_links = post_container.find_all('a', href=True)
+            all_links = _XPATH_HREF_LINKS(post_container)
             for link in all_links:
                 chapter_url = link.get('href')
-                chapter_title = link.get_text(strip=True)
-                if chapter_url and chapter_title and ('/topics/' in chapter_url or '/lessons/' in chapter_url):
+                if '/topics/' not in chapter_url and '/lessons/' not in chapter_url:
+                    continue
+                chapter_title = _get_text(link)
+                if chapter_title:
                     chapter_url = urljoin(base_url, chapter_url)
-                    if not any(ch['url'] == chapter_url for ch in chapters):
+                    if chapter_url not in seen_urls:
+                        seen_urls.add(chapter_url)
                         chapters.append({
                             'title': chapter_title,
                             'url': chapter_url,
                             'type': 'link'
                         })
         if not chapters:
-            links = post_container.find_all('a', class_=re.compile(r'ld-item-name'))
+            links = _XPATH_ITEM_NAME_LINKS(post_container)
             for link in links:
-                chapter_title = link.get_text(strip=True)
+                chapter_title = _get_text(link)
                 chapter_url = link.get('href')
                 if chapter_url and chapter_title:
                     chapter_url = urljoin(base_url, chapter_url)
@@ -314,83 +466,120 @@ def extract_chapter_links(soup, base_url):
     return chapters
 
 
-def extract_chapter_content(url):
-    """Extract content from a chapter page."""
-    print(f"  Fetching chapter: {url}")
+def _first_match(tree, xpath):
+    """Return the first element matching a compiled XPath, or None."""
+    matches = xpath(tree)
+    return matches[0] if matches else None
+
+
+def extract_chapter_content(url, session):
+    """Fetch a chapter page and extract its content.
+    The body is fed to lxml chunk by chunk as it arrives, so parsing overlaps
+    the download and the page is never held as one bytes object.
+    """
+    log.debug(f"  Fetching chapter: {url}")
+    # A fresh parser per call: lxml parsers lock when shared across threads.
+    parser = lxml.html.HTMLParser(encoding='utf-8')
     try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        response.encoding = 'utf-8'
+        with session.get(url, timeout=REQUEST_TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=PAGE_CHUNK_SIZE):
+                parser.feed(chunk)
     except requests.RequestException as e:
-        print(f"  Error fetching chapter: {e}")
+        log.error(f"  Error fetching chapter: {e}")
+        return None
+    try:
+        tree = parser.close()
+    except lxml.etree.XMLSyntaxError:
         return None
-    soup = BeautifulSoup(response.text, 'lxml')
-    toc_div = soup.find('div', id='ftwp-container-outer')
-    content_div = soup.find('div', id='ftwp-postcontent')
-    if toc_div and content_div:
-        combined_html = str(toc_div) + str(content_div)
-        return clean_html_for_epub(combined_html)
-    if content_div:
-        return clean_html_for_epub(str(content_div))
-    content_div = soup.find('div', class_='ld-tab-content entry-content')
-    if content_div:
-        return clean_html_for_epub(str(content_div))
-    content_div = soup.find('div', class_='entry-content')
-    if content_div:
-        return clean_html_for_epub(str(content_div))
-    content_div = soup.find('div', class_=re.compile(r'ld-tab-content'))
-    if content_div:
-        return clean_html_for_epub(str(content_div))
+    if tree is None:
+        return None
+    return extract_chapter_body(tree)
+
+
+def extract_chapter_body(tree):
+    """Extract the cleaned chapter body from a parsed chapter page."""
+    toc_div = _first_match(tree, _XPATH_TOC)
+    content_div = _first_match(tree, _XPATH_POSTCONTENT)
+    if content_div is None:
+        toc_div = None
+        content_div = _pick_content_div(_XPATH_CONTENT_CANDIDATES(tree))
+    if content_div is None:
+        return None
+    if not _XPATH_HAS_CONTENT(content_div):
+        # Nothing but whitespace: drop the children instead of cleaning them, but
+        # keep the div so the chapter keeps its place in the TOC and spine.
+        del content_div[:]
+    if toc_div is not None:
+        return clean_html_for_epub(toc_div) + clean_html_for_epub(content_div)
+    return clean_html_for_epub(content_div)
+
+
+def _pick_content_div(candidates):
+    """Choose the chapter body among the entry-content/ld-tab-content divs.
+    Prefers the exact 'ld-tab-content entry-content' div, then any div with
+    an entry-content class, then any ld-tab-content div.
+    """
+    for div in candidates:
+        if div.get('class') == 'ld-tab-content entry-content':
+            return div
+    for div in candidates:
+        if 'entry-content' in div.get('class').split():
+            return div
+    for div in candidates:
+        if 'ld-tab-content' in div.get('class'):
+            return div
     return None
 
 
-def download_cover_image(url):
+def fetch_chapter_contents(chapters, session, executor):
+    """Fetch the content of every chapter before the EPUB is assembled.
+    Linked chapters are downloaded concurrently on executor; direct chapters
+    already carry their content. Returns a list of contents in chapter order.
+    """
+    contents = [chapter.get('content', '') if chapter.get('type') == 'direct' else None
+                for chapter in chapters]
+    link_indexes = [i for i, chapter in enumerate(chapters) if chapter.get('type') != 'direct']
+    if not link_indexes:
+        return contents
+    results = executor.map(lambda i: extract_chapter_content(chapters[i]['url'], session),
+                           link_indexes)
+    for i, content in zip(link_indexes, results):
+        contents[i] = content
+    return contents
+
+
+def download_cover_image(url, session):
     """Download cover image, validate it, and convert to JPEG format."""
     if not url:
         return None, None
     try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        if not response.content or len(response.content) < 100:
-            print(f"  Warning: Cover image appears to be empty or too small")
+        image_buffer = BytesIO()
+        with session.get(url, timeout=REQUEST_TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            if not is_image_response(response):
+                log.warning(f"  Warning: Cover URL did not return an image")
+                return None, None
+            for chunk in response.iter_content(chunk_size=COVER_CHUNK_SIZE):
+                image_buffer.write(chunk)
+                if image_buffer.tell() > COVER_MAX_BYTES:
+                    log.warning(f"  Warning: Cover image is larger than {COVER_MAX_BYTES} bytes")
+                    return None, None
+        if image_buffer.tell() < 100:
+            log.warning(f"  Warning: Cover image appears to be empty or too small")
             return None, None
         try:
-            img = Image.open(BytesIO(response.content))
-            img.verify()
-            img = Image.open(BytesIO(response.content))
-            if img.mode in ('RGBA', 'LA'):
-                rgb_img = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'RGBA':
-                    rgb_img.paste(img, mask=img.split()[-1])
-                else:
-                    rgb_img.paste(img.convert('RGB'))
-                img = rgb_img
-            elif img.mode == 'P':
-                if 'transparency' in img.info:
-                    img = img.convert('RGBA')
-                    rgb_img = Image.new('RGB', img.size, (255, 255, 255))
-                    rgb_img.paste(img, mask=img.split()[-1])
-                    img = rgb_img
-                else:
-                    img = img.convert('RGB')
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-            output = BytesIO()
-            img.save(output, format='JPEG', quality=95, optimize=True)
-            jpeg_data = output.getvalue()
-            output.close()
-            test_img = Image.open(BytesIO(jpeg_data))
-            test_img.load()
-            test_img.close()
+            image_buffer.seek(0)
+            jpeg_data = _to_rgb_jpeg(image_buffer, quality=95)
             if len(jpeg_data) < 100:
-                print(f"  Warning: Converted JPEG appears to be too small")
+                log.warning(f"  Warning: Converted JPEG appears to be too small")
                 return None, None
             return jpeg_data, 'jpg'
         except Exception as img_error:
-            print(f"  Warning: Could not process cover image: {img_error}")
+            log.warning(f"  Warning: Could not process cover image: {img_error}")
             return None, None
     except requests.RequestException as e:
-        print(f"  Warning: Could not download cover image: {e}")
+        log.warning(f"  Warning: Could not download cover image: {e}")
         return None, None
 
 
@@ -398,90 +587,103 @@ def escape_xml(text):
     """Escape XML special characters."""
     if not text:
         return ''
-    return (text
-            .replace('&', '&amp;')
-            .replace('<', '&lt;')
-            .replace('>', '&gt;')
-            .replace('"', '&quot;')
-            .replace("'", '&apos;'))
+    return text.translate(_XML_ESCAPES)
+
+
+def _write_epub(output_filename, book):
+    """Write the book like epub.write_epub, but store images uncompressed.
+    JPEG data does not deflate any further, so compressing it again only costs CPU.
+    """
+    from ebooklib import epub
+    image_names = {f'{book.FOLDER_NAME}/{item.file_name}' for item in book.get_items()
+                   if item.media_type.startswith('image/')}
+    class StoredImagesWriter(epub.EpubWriter):
+        def _write_items(self):
+            writestr = self.out.writestr
+            def write_item(name, data, *args, **kwargs):
+                if name in image_names:
+                    kwargs['compress_type'] = zipfile.ZIP_STORED
+                return writestr(name, data, *args, **kwargs)
+            self.out.writestr = write_item
+            super()._write_items()
+    writer = StoredImagesWriter(output_filename, book, {'compresslevel': EPUB_COMPRESSLEVEL})
+    writer.process()
+    writer.write()
 
 
-def create_epub(metadata, chapters, output_filename):
-    """Create an EPUB file from the book metadata and chapters."""
+def create_epub(metadata, chapters, output_filename, session=None, max_workers=MAX_WORKERS):
+    """Create an EPUB file from the book metadata and chapters.
+    The cover, intro images and chapters share one pool, so at most
+    max_workers pages or images are downloaded at the same time.
+    """
+    from ebooklib import epub
+    if session is None:
+        session = create_session(max_workers=max_workers)
     book = epub.EpubBook()
     book.set_identifier(metadata['url'])
     book.set_title(metadata['title'])
     book.set_language('bn')
     if metadata['editors']:
         book.add_author(metadata['editors'])
-    if metadata['cover_image_url']:
-        print("  Downloading cover image...")
-        cover_data, cover_ext = download_cover_image(metadata['cover_image_url'])
-        if cover_data:
-            book.set_cover(f'cover.{cover_ext}', cover_data)
-            print("  ✓ Cover image added")
-    intro_images = []
-    if metadata['intro_html']:
-        print("  Processing intro content images...")
-        processed_intro_html, intro_images = process_intro_images(metadata['intro_html'])
-        intro_content = f"""
-        <html>
-        <head><title>{metadata['title']}</title></head>
-        <body>
-            {processed_intro_html}
-        </body>
-        </html>
-        """
-    else:
-        intro_content = f"""
-        <html>
-        <head><title>{metadata['title']}</title></head>
-        <body>
-            <h1>{metadata['title']}</h1>
-            {f'<h2>{metadata["subtitle"]}</h2>' if metadata['subtitle'] else ''}
-            {f'<p>{metadata["editors"]}</p>' if metadata['editors'] else ''}
-            {f'<p>{metadata["acknowledgments"]}</p>' if metadata['acknowledgments'] else ''}
-        </body>
-        </html>
-        """
-    for img_filename, img_data, media_type in intro_images:
-        img_item = epub.EpubItem(
-            uid=img_filename.replace('.', '_'),
-            file_name=img_filename,
-            media_type=media_type,
-            content=img_data
-        )
-        book.add_item(img_item)
-    intro_chapter = epub.EpubHtml(title='Book Information',
-                                   file_name='intro.xhtml',
-                                   lang='bn')
-    intro_chapter.content = intro_content
-    book.add_item(intro_chapter)
-    epub_chapters = [intro_chapter]
-    for i, chapter in enumerate(chapters):
-        print(f"Processing chapter {i+1}/{len(chapters)}: {chapter['title']}")
-        if chapter.get('type') == 'direct':
-            content = chapter.get('content', '')
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        cover_future = None
+        if metadata['cover_image_url']:
+            log.info("  Downloading cover image...")
+            # Queued first so it downloads while the intro images and chapters are fetched.
+            cover_future = executor.submit(download_cover_image, metadata['cover_image_url'], session)
+        intro_images = []
+        book_title = escape_xml(metadata['title'])
+        if metadata['intro_html']:
+            log.info("  Processing intro content images...")
+            processed_intro_html, intro_images = process_intro_images(
+                metadata['intro_html'], session, executor)
+            intro_content = f"{_XHTML_PREFIX}{book_title}{_XHTML_BODY}{processed_intro_html}{_XHTML_SUFFIX}"
         else:
-            content = extract_chapter_content(chapter['url'])
+            parts = [_XHTML_PREFIX, book_title, _XHTML_BODY, f"<h1>{book_title}</h1>"]
+            if metadata['subtitle']:
+                parts.append(f"<h2>{escape_xml(metadata['subtitle'])}</h2>")
+            if metadata['editors']:
+                parts.append(f"<p>{escape_xml(metadata['editors'])}</p>")
+            if metadata['acknowledgments']:
+                parts.append(f"<p>{escape_xml(metadata['acknowledgments'])}</p>")
+            parts.append(_XHTML_SUFFIX)
+            intro_content = ''.join(parts)
+        for img_filename, img_data, media_type in intro_images:
+            img_item = epub.EpubItem(
+                uid=img_filename.replace('.', '_'),
+                file_name=img_filename,
+                media_type=media_type,
+                content=img_data
+            )
+            book.add_item(img_item)
+        intro_chapter = epub.EpubHtml(title='Book Information',
+                                       file_name='intro.xhtml',
+                                       lang='bn')
+        intro_chapter.content = intro_content
+        book.add_item(intro_chapter)
+        epub_chapters = [intro_chapter]
+        contents = fetch_chapter_contents(chapters, session, executor)
+        if cover_future is not None:
+            cover_data, cover_ext = cover_future.result()
+            if cover_data:
+                book.set_cover(f'cover.{cover_ext}', cover_data)
+                log.info("  ✓ Cover image added")
+    for i, chapter in enumerate(chapters):
+        content = contents[i]
+        # Drop the list's reference so only the wrapped page below stays alive.
+        contents[i] = None
+        log.info(f"Processing chapter {i+1}/{len(chapters)}: {chapter['title']}")
         if content:
             chapter_file = f'chapter_{i+1}.xhtml'
             epub_chapter = epub.EpubHtml(title=chapter['title'],
                                          file_name=chapter_file,
                                          lang='bn')
-            epub_chapter.content = f"""
-            <html>
-            <head><title>{chapter['title']}</title></head>
-            <body>
-                <h1>{chapter['title']}</h1>
-                {content}
-            </body>
-            </html>
-            """
+            title = escape_xml(chapter['title'])
+            epub_chapter.content = f"{_XHTML_PREFIX}{title}{_XHTML_BODY}<h1>{title}</h1>{content}{_XHTML_SUFFIX}"
             book.add_item(epub_chapter)
             epub_chapters.append(epub_chapter)
         else:
-            print(f"  Warning: Could not extract content for chapter: {chapter['title']}")
+            log.warning(f"  Warning: Could not extract content for chapter: {chapter['title']}")
     book.toc = tuple(epub_chapters)
     book.add_item(epub.EpubNcx())
     book.add_item(epub.EpubNav())
@@ -506,49 +708,65 @@ def create_epub(metadata, chapters, output_filename):
                             content=style)
     book.add_item(nav_css)
     book.spine = ['nav'] + epub_chapters
-    epub.write_epub(output_filename, book, {})
-    print(f"\n✓ EPUB created successfully: {output_filename}")
+    _write_epub(output_filename, book)
+    log.info(f"\n✓ EPUB created successfully: {output_filename}")
 
 
 def main():
+    import argparse
     parser = argparse.ArgumentParser(
         description='Convert eBangla Library books to EPUB format'
     )
     parser.add_argument('url', help='URL of the book on ebanglalibrary.com')
     parser.add_argument('-o', '--output', help='Output filename (optional)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Fetch everything from the network without using the response cache')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='Also log every chapter URL as it is fetched')
+    parser.add_argument('--concurrency', type=int, default=MAX_WORKERS,
+                        help='Maximum number of parallel downloads (default: %(default)s)')
     args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error('--concurrency must be at least 1')
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
+    if args.verbose:
+        # Only this script's logger, so requests-cache and urllib3 stay quiet.
+        log.setLevel(logging.DEBUG)
     book_url = args.url
     parsed_url = urlparse(book_url)
     if 'ebanglalibrary.com' not in parsed_url.netloc:
-        print("Error: URL must be from ebanglalibrary.com")
+        log.error("Error: URL must be from ebanglalibrary.com")
         sys.exit(1)
-    print(f"Fetching book page: {book_url}")
+    session = create_session(use_cache=not args.no_cache, max_workers=args.concurrency)
+    log.info(f"Fetching book page: {book_url}")
     try:
-        response = requests.get(book_url, timeout=30)
+        response = session.get(book_url, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
-        response.encoding = 'utf-8'
     except requests.RequestException as e:
-        print(f"Error fetching book page: {e}")
+        log.error(f"Error fetching book page: {e}")
+        sys.exit(1)
+    try:
+        tree = lxml.html.document_fromstring(response.content,
+                                             parser=lxml.html.HTMLParser(encoding='utf-8'))
+    except lxml.etree.ParserError as e:
+        log.error(f"Error parsing book page: {e}")
         sys.exit(1)
-    soup = BeautifulSoup(response.text, 'lxml')
-    print("Extracting book metadata...")
-    metadata = extract_book_metadata(soup, book_url)
-    print(f"  Title: {metadata['title']}")
+    log.info("Extracting book metadata...")
+    metadata, chapters = scan_book_page(tree, book_url)
+    log.info(f"  Title: {metadata['title']}")
     if metadata['subtitle']:
-        print(f"  Subtitle: {metadata['subtitle']}")
+        log.info(f"  Subtitle: {metadata['subtitle']}")
     if metadata['editors']:
-        print(f"  Editors: {metadata['editors']}")
-    print("\nDetecting page structure...")
-    chapters = extract_direct_content_chapters(soup)
-    if chapters:
-        print(f"  ✓ Detected new page structure (direct content)")
-        print(f"  Found {len(chapters)} chapters")
+        log.info(f"  Editors: {metadata['editors']}")
+    log.info("\nDetecting page structure...")
+    if chapters and chapters[0]['type'] == 'direct':
+        log.info(f"  ✓ Detected new page structure (direct content)")
+        log.info(f"  Found {len(chapters)} chapters")
     else:
-        print(f"  Detected old page structure (topic links)")
-        chapters = extract_chapter_links(soup, book_url)
-        print(f"  Found {len(chapters)} chapters")
+        log.info(f"  Detected old page structure (topic links)")
+        log.info(f"  Found {len(chapters)} chapters")
     if not chapters:
-        print("Error: No chapters found on the page")
+        log.error("Error: No chapters found on the page")
         sys.exit(1)
     if args.output:
         output_filename = args.output
@@ -556,8 +774,8 @@ def main():
         filename_title = metadata.get('filename_title') or metadata['title']
         safe_title = sanitize_filename(filename_title)
         output_filename = f"{safe_title}.epub"
-    print(f"\nCreating EPUB file...")
-    create_epub(metadata, chapters, output_filename)
+    log.info(f"\nCreating EPUB file...")
+    create_epub(metadata, chapters, output_filename, session, args.concurrency)
 
 
 if __name__ == '__main__':